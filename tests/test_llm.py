@@ -0,0 +1,200 @@
+"""Unit tests for streaming response parsing in the LLM client."""
+
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from vics_agent.config import LLMConfig
+from vics_agent.llm import LLMClient, Message, TextEvent, ToolCallEvent
+
+
+def make_client(monkeypatch, provider, events):
+    """Build an LLMClient whose provider SDK replays `events` as the streamed reply."""
+
+    class FakeStream:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            pass
+
+        def __iter__(self):
+            return iter(events)
+
+    class FakeOpenAI:
+        def __init__(self, **kwargs):
+            self.chat = SimpleNamespace(
+                completions=SimpleNamespace(create=lambda **kw: iter(events))
+            )
+
+    class FakeAnthropic:
+        def __init__(self, **kwargs):
+            self.messages = SimpleNamespace(stream=lambda **kw: FakeStream())
+
+    monkeypatch.setitem(sys.modules, "openai", SimpleNamespace(OpenAI=FakeOpenAI))
+    monkeypatch.setitem(sys.modules, "anthropic", SimpleNamespace(Anthropic=FakeAnthropic))
+    return LLMClient(LLMConfig(provider=provider, api_key="test"))
+
+
+def stream(client):
+    events = list(client.stream_incremental([Message(role="user", content="hi")]))
+    client.close()
+    return events
+
+
+def summarize(events):
+    """Reduce events to comparable tuples, checking the Message comes last."""
+    assert isinstance(events[-1], Message)
+    assert not any(isinstance(e, Message) for e in events[:-1])
+    out = []
+    for e in events[:-1]:
+        if isinstance(e, ToolCallEvent):
+            out.append(("call", e.call["id"], e.call["function"]["arguments"], e.text))
+        else:
+            assert isinstance(e, TextEvent)
+            out.append(("text", e.text))
+    return out, events[-1]
+
+
+# ── OpenAI ───────────────────────────────────────────────────────────────
+
+
+def oa_chunk(content=None, tool_calls=None):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(delta=SimpleNamespace(content=content, tool_calls=tool_calls))]
+    )
+
+
+def oa_call(index, id=None, name=None, arguments=None):
+    return SimpleNamespace(
+        index=index, id=id, function=SimpleNamespace(name=name, arguments=arguments)
+    )
+
+
+class TestOpenAIStream:
+    def test_arguments_split_across_chunks(self, monkeypatch):
+        client = make_client(
+            monkeypatch,
+            "openai",
+            [
+                oa_chunk(tool_calls=[oa_call(0, "c1", "read_file", '{"pa')]),
+                oa_chunk(tool_calls=[oa_call(0, arguments='th": "a.py"}')]),
+            ],
+        )
+        events, message = summarize(stream(client))
+        assert events == [("call", "c1", '{"path": "a.py"}', "")]
+        assert message.tool_calls[0]["function"]["name"] == "read_file"
+        assert message.tool_calls[0]["function"]["_parsed"] == {"path": "a.py"}
+
+    def test_two_calls_with_surrounding_text(self, monkeypatch):
+        client = make_client(
+            monkeypatch,
+            "openai",
+            [
+                oa_chunk("Let me "),
+                oa_chunk("look."),
+                oa_chunk(tool_calls=[oa_call(0, "c1", "think", '{"thought": "x"}')]),
+                oa_chunk(tool_calls=[oa_call(1, "c2", "list_directory", '{"path": "."}')]),
+                oa_chunk("Done."),
+                SimpleNamespace(choices=[]),
+            ],
+        )
+        events, message = summarize(stream(client))
+        assert events == [
+            ("call", "c1", '{"thought": "x"}', "Let me look."),
+            ("call", "c2", '{"path": "."}', ""),
+            ("text", "Done."),
+        ]
+        assert message.content == "Let me look.Done."
+        assert [tc["id"] for tc in message.tool_calls] == ["c1", "c2"]
+
+    def test_text_only_reply(self, monkeypatch):
+        client = make_client(monkeypatch, "openai", [oa_chunk("do"), oa_chunk("ne")])
+        events, message = summarize(stream(client))
+        assert events == []
+        assert message.content == "done"
+        assert message.tool_calls == []
+
+
+# ── Anthropic ────────────────────────────────────────────────────────────
+
+
+def an_text(index, text):
+    return [
+        SimpleNamespace(
+            type="content_block_start", index=index, content_block=SimpleNamespace(type="text")
+        ),
+        SimpleNamespace(
+            type="content_block_delta",
+            index=index,
+            delta=SimpleNamespace(type="text_delta", text=text),
+        ),
+        SimpleNamespace(type="content_block_stop", index=index),
+    ]
+
+
+def an_tool(index, id, name, *partial_json):
+    block = SimpleNamespace(type="tool_use", id=id, name=name)
+    return [
+        SimpleNamespace(type="content_block_start", index=index, content_block=block),
+        *(
+            SimpleNamespace(
+                type="content_block_delta",
+                index=index,
+                delta=SimpleNamespace(type="input_json_delta", partial_json=p),
+            )
+            for p in partial_json
+        ),
+        SimpleNamespace(type="content_block_stop", index=index),
+    ]
+
+
+class TestAnthropicStream:
+    def test_text_block_then_tool_use(self, monkeypatch):
+        client = make_client(
+            monkeypatch,
+            "anthropic",
+            [
+                SimpleNamespace(type="message_start"),
+                *an_text(0, "Thinking"),
+                *an_tool(1, "t1", "read_file", '{"path"', ': "a.py"}'),
+                SimpleNamespace(type="message_stop"),
+            ],
+        )
+        events, message = summarize(stream(client))
+        assert events == [("call", "t1", '{"path": "a.py"}', "Thinking")]
+        assert message.content == "Thinking"
+        assert message.tool_calls[0]["function"]["_parsed"] == {"path": "a.py"}
+
+    def test_two_tool_uses_and_trailing_text(self, monkeypatch):
+        client = make_client(
+            monkeypatch,
+            "anthropic",
+            [
+                *an_tool(0, "t1", "think", '{"thought": "y"}'),
+                *an_tool(1, "t2", "list_directory", '{"path": "."}'),
+                *an_text(2, "Checking both."),
+            ],
+        )
+        events, message = summarize(stream(client))
+        assert events == [
+            ("call", "t1", '{"thought": "y"}', ""),
+            ("call", "t2", '{"path": "."}', ""),
+            ("text", "Checking both."),
+        ]
+        assert message.content == "Checking both."
+
+    def test_empty_input_json(self, monkeypatch):
+        client = make_client(monkeypatch, "anthropic", an_tool(0, "t1", "list_directory"))
+        events, message = summarize(stream(client))
+        assert events == [("call", "t1", "{}", "")]
+        assert message.tool_calls[0]["function"]["_parsed"] == {}
+
+
+@pytest.mark.parametrize("provider", ["openai", "anthropic"])
+def test_chat_incremental_returns_final_message(monkeypatch, provider):
+    events = [oa_chunk("hello")] if provider == "openai" else an_text(0, "hello")
+    client = make_client(monkeypatch, provider, events)
+    assert client.chat_incremental([Message(role="user", content="hi")]).content == "hello"
+    client.close()
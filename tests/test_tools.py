@@ -2,11 +2,12 @@
 
 import os
 import tempfile
+import time
 from pathlib import Path
 
 import pytest
 
-from vics_agent.tools import execute_tool
+from vics_agent.tools import TOOL_REGISTRY, TOOL_SCHEMAS, execute_tool, tool
 
 
 @pytest.fixture
@@ -25,10 +26,38 @@ class TestReadFile:
         result = execute_tool("read_file", {"path": "nope.txt"}, workspace)
         assert "Error" in result
 
+    def test_read_sees_changes_after_cached_read(self, workspace):
+        target = workspace / "cfg.txt"
+        target.write_text("mode = a")
+        assert execute_tool("read_file", {"path": "cfg.txt"}, workspace) == "mode = a"
+        execute_tool(
+            "edit_file", {"path": "cfg.txt", "old_string": "a", "new_string": "b"}, workspace
+        )
+        assert execute_tool("read_file", {"path": "cfg.txt"}, workspace) == "mode = b"
+        target.write_text("mode = external")
+        assert execute_tool("read_file", {"path": "cfg.txt"}, workspace) == "mode = external"
+
     def test_read_path_traversal_blocked(self, workspace):
         result = execute_tool("read_file", {"path": "../../etc/passwd"}, workspace)
         assert "Error" in result
 
+    def test_read_sibling_with_shared_prefix_blocked(self, tmp_path):
+        workspace = tmp_path / "ws"
+        workspace.mkdir()
+        (tmp_path / "ws-backup").mkdir()
+        (tmp_path / "ws-backup" / "secret.txt").write_text("secret")
+        result = execute_tool("read_file", {"path": "../ws-backup/secret.txt"}, workspace)
+        assert "Access denied" in result
+
+    def test_relative_workspace_follows_cwd(self, tmp_path, monkeypatch):
+        for name in ("a", "b"):
+            (tmp_path / name).mkdir()
+            (tmp_path / name / "which.txt").write_text(name)
+        monkeypatch.chdir(tmp_path / "a")
+        assert execute_tool("read_file", {"path": "which.txt"}, Path(".")) == "a"
+        monkeypatch.chdir(tmp_path / "b")
+        assert execute_tool("read_file", {"path": "which.txt"}, Path(".")) == "b"
+
 
 class TestWriteFile:
     def test_write_new_file(self, workspace):
@@ -45,6 +74,17 @@ class TestWriteFile:
         assert "Successfully wrote" in result
         assert (workspace / "src" / "utils" / "helpers.py").exists()
 
+    @pytest.mark.skipif(
+        os.name == "nt" or os.geteuid() == 0, reason="root bypasses file permissions"
+    )
+    def test_write_refuses_read_only_file(self, workspace):
+        target = workspace / "locked.txt"
+        target.write_text("original")
+        target.chmod(0o444)
+        result = execute_tool("write_file", {"path": "locked.txt", "content": "new"}, workspace)
+        assert "PermissionError" in result
+        assert target.read_text() == "original"
+
     def test_write_path_traversal_blocked(self, workspace):
         result = execute_tool(
             "write_file",
@@ -84,6 +124,46 @@ class TestEditFile:
         assert "2 times" in result
 
 
+class TestEditFileBatch:
+    def test_batch_applies_edits_in_order(self, workspace):
+        (workspace / "app.py").write_text("a = 1\nb = 2\n")
+        result = execute_tool(
+            "edit_file_batch",
+            {
+                "path": "app.py",
+                "edits": [
+                    {"old_string": "a = 1", "new_string": "a = 10"},
+                    {"old_string": "a = 10\nb", "new_string": "a = 10\nc"},
+                ],
+            },
+            workspace,
+        )
+        assert "Successfully applied 2 edits" in result
+        assert (workspace / "app.py").read_text() == "a = 10\nc = 2\n"
+
+    def test_batch_failure_leaves_file_unchanged(self, workspace):
+        (workspace / "app.py").write_text("a = 1\n")
+        result = execute_tool(
+            "edit_file_batch",
+            {
+                "path": "app.py",
+                "edits": [
+                    {"old_string": "a = 1", "new_string": "a = 2"},
+                    {"old_string": "missing", "new_string": "x"},
+                ],
+            },
+            workspace,
+        )
+        assert "edit 2" in result
+        assert (workspace / "app.py").read_text() == "a = 1\n"
+        assert [p.name for p in workspace.iterdir()] == ["app.py"]
+
+    def test_batch_rejects_empty_edits(self, workspace):
+        (workspace / "app.py").write_text("a = 1\n")
+        result = execute_tool("edit_file_batch", {"path": "app.py", "edits": []}, workspace)
+        assert "at least one edit" in result
+
+
 class TestListDirectory:
     def test_list_directory(self, workspace):
         (workspace / "file.txt").write_text("content")
@@ -110,6 +190,43 @@ class TestSearchFiles:
         result = execute_tool("search_files", {"pattern": "nonexistent_xyz"}, workspace)
         assert "No matches" in result
 
+    def test_search_skips_binary_files(self, workspace):
+        (workspace / "blob.bin").write_bytes(b"\x00\x01hello\x00")
+        (workspace / "main.py").write_text("hello = 1")
+        result = execute_tool("search_files", {"pattern": "hello"}, workspace)
+        assert "main.py" in result
+        assert "blob.bin" not in result
+
+    def test_search_dollar_matches_before_crlf(self, workspace):
+        (workspace / "win.txt").write_bytes(b"foo\r\nbar\r\n")
+        result = execute_tool("search_files", {"pattern": "foo$"}, workspace)
+        assert result == "win.txt:1: foo"
+
+    def test_search_folds_non_ascii_case(self, workspace):
+        (workspace / "notes.txt").write_text("x\nÄBC\n", encoding="utf-8")
+        result = execute_tool("search_files", {"pattern": "äbc"}, workspace)
+        assert result == "notes.txt:2: ÄBC"
+
+    def test_search_skips_dependency_directories(self, workspace):
+        (workspace / "node_modules" / "lib").mkdir(parents=True)
+        (workspace / "node_modules" / "lib" / "index.js").write_text("hello")
+        (workspace / "main.py").write_text("hello = 1")
+        result = execute_tool("search_files", {"pattern": "hello"}, workspace)
+        assert result == "main.py:1: hello = 1"
+
+    def test_search_explicit_glob_enters_pruned_directory(self, workspace):
+        (workspace / "build").mkdir()
+        (workspace / "build" / "x.py").write_text("needle = 1")
+        result = execute_tool(
+            "search_files", {"pattern": "needle", "file_glob": "build/*.py"}, workspace
+        )
+        assert result == f"build{os.sep}x.py:1: needle = 1"
+
+    def test_search_reports_line_numbers(self, workspace):
+        (workspace / "notes.txt").write_text("alpha\nbeta\n\ngamma beta\n")
+        result = execute_tool("search_files", {"pattern": "^gamma|beta$"}, workspace)
+        assert result.splitlines() == ["notes.txt:2: beta", "notes.txt:4: gamma beta"]
+
 
 class TestRunCommand:
     def test_run_echo(self, workspace):
@@ -120,6 +237,7 @@ class TestRunCommand:
         result = execute_tool("run_command", {"command": "rm -rf /"}, workspace)
         assert "blocked" in result.lower()
 
+    @pytest.mark.slow
     def test_run_timeout(self, workspace):
         # Use a very short timeout
         if os.name == "nt":
@@ -129,6 +247,17 @@ class TestRunCommand:
         result = execute_tool("run_command", {"command": cmd, "timeout": 1}, workspace)
         assert "timed out" in result.lower()
 
+    @pytest.mark.slow
+    @pytest.mark.skipif(os.name == "nt", reason="POSIX shell job control")
+    def test_run_background_child_does_not_hang(self, workspace):
+        start = time.monotonic()
+        result = execute_tool(
+            "run_command", {"command": "sleep 30 & echo hi", "timeout": 1}, workspace
+        )
+        assert time.monotonic() - start < 10
+        assert "hi" in result
+        assert "cut off" in result
+
 
 class TestDeleteFile:
     def test_delete_existing(self, workspace):
@@ -146,3 +275,11 @@ class TestUnknownTool:
     def test_unknown_tool(self, workspace):
         result = execute_tool("nonexistent_tool", {}, workspace)
         assert "Unknown tool" in result
+
+
+class TestRegistry:
+    def test_late_registration_is_refused(self):
+        with pytest.raises(RuntimeError, match="frozen"):
+            tool("late", "Registered after import.", {"type": "object"})(lambda workspace: "")
+        assert "late" not in TOOL_REGISTRY
+        assert len(TOOL_REGISTRY) == len(TOOL_SCHEMAS)
@@ -0,0 +1,7 @@
+"""Shared rich Console used by the agent loop and the CLI."""
+
+from __future__ import annotations
+
+from rich.console import Console
+
+console = Console(highlight=False, legacy_windows=False)
@@ -2,18 +2,24 @@
 
 from __future__ import annotations
 
-import json
+import reprlib
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from pathlib import Path
 
-from rich.console import Console
-from rich.markdown import Markdown
 from rich.panel import Panel
+from rich.text import Text
 
+from vics_agent._console import console
 from vics_agent.config import AgentConfig
-from vics_agent.llm import LLMClient, Message
-from vics_agent.tools import TOOL_SCHEMAS, execute_tool
+from vics_agent.llm import LLMClient, Message, TextEvent, ToolCallEvent, parse_tool_arguments
+from vics_agent.tools import TOOL_SCHEMAS, WorkspaceCtx, execute_tool
 
-console = Console()
+# Tools with no side effects; these may run concurrently within a turn
+_PARALLEL_SAFE_TOOLS = frozenset({"read_file", "list_directory", "search_files", "think"})
+
+# Bounded repr for tool-argument summaries; never builds more than ~60 chars
+_short_repr = reprlib.Repr()
+_short_repr.maxstring = _short_repr.maxother = 60
 
 SYSTEM_PROMPT = """\
 You are **Vics Agent**, an autonomous coding assistant created by Vics.
@@ -43,10 +49,13 @@ class Agent:
 
     def __init__(self, config: AgentConfig | None = None):
         self.config = config or AgentConfig.from_env()
-        self.llm = LLMClient(self.config.llm)
+        self.llm = LLMClient(self.config.llm, tools=TOOL_SCHEMAS)
         self.messages: list[Message] = [Message(role="system", content=SYSTEM_PROMPT)]
+        self._sent = 0  # number of messages already handed to the LLM client
         self.workspace = self.config.workspace.resolve()
         self.workspace.mkdir(parents=True, exist_ok=True)
+        self._workspace_ctx = WorkspaceCtx(path=self.workspace, resolved=str(self.workspace))
+        self._pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="vics-tool")
 
     def run(self, user_input: str) -> str:
         """Run the agent loop for a single user request. Returns final text response."""
@@ -54,58 +63,152 @@ class Agent:
 
         for iteration in range(1, self.config.max_iterations + 1):
             if self.config.verbose:
-                console.print(f"[dim]── iteration {iteration} ──[/dim]")
-
-            # Ask the LLM
-            response = self.llm.chat(self.messages, tools=TOOL_SCHEMAS)
+                _plain(f"── iteration {iteration} ──", "dim")
+
+            self._trim_history()
+
+            # Ask the LLM, sending only the messages it hasn't seen yet. The reply
+            # is streamed, and each tool runs as soon as its arguments arrive.
+            new_messages = self.messages[self._sent :]
+            self._sent = len(self.messages)
+            pending: list[Future[str]] = []
+            response: Message | None = None
+            for event in self.llm.stream_incremental(new_messages):
+                if isinstance(event, ToolCallEvent):
+                    # Print any thinking / text the model emitted before this call
+                    if event.text:
+                        _plain(event.text, "cyan")
+                    pending.append(self._submit(event.call, pending))
+                elif isinstance(event, TextEvent):
+                    _plain(event.text, "cyan")  # text after the last tool call
+                else:
+                    response = event
             self.messages.append(response)
 
             # If no tool calls, we're done
             if not response.tool_calls:
                 if response.content:
-                    console.print(Panel(Markdown(response.content), title="Vics Agent", border_style="cyan"))
+                    if self.config.render_markdown and console.is_terminal:
+                        from rich.markdown import Markdown  # deferred: pulls in Pygments
+
+                        console.print(
+                            Panel(
+                                Markdown(response.content),
+                                title="Vics Agent",
+                                border_style="cyan",
+                            )
+                        )
+                    else:
+                        # Plain output skips Markdown parsing and code-block lexing
+                        _plain(response.content)
                 return response.content
 
-            # Print any thinking / text the model emitted alongside tool calls
-            if response.content:
-                console.print(f"[cyan]{response.content}[/cyan]")
-
-            # Execute each tool call
-            for tc in response.tool_calls:
-                fn_name = tc["function"]["name"]
-                try:
-                    fn_args = json.loads(tc["function"]["arguments"])
-                except json.JSONDecodeError:
-                    fn_args = {}
-
-                # Show what's happening
-                args_summary = ", ".join(f"{k}={_shorten(v)}" for k, v in fn_args.items())
-                console.print(f"  [yellow]⚡ {fn_name}[/yellow]({args_summary})")
-
-                result = execute_tool(fn_name, fn_args, self.workspace)
+            # Feed results back to the LLM, in the order the calls were made
+            for tc, future in zip(response.tool_calls, pending):
+                result = future.result()
 
                 # Show short result
                 display = result if len(result) <= 200 else result[:200] + "…"
-                console.print(f"  [dim]→ {display}[/dim]")
+                _plain(f"  → {display}", "dim")
 
-                # Feed result back to the LLM
                 self.messages.append(
-                    Message(role="tool", content=result, tool_call_id=tc["id"], name=fn_name)
+                    Message(
+                        role="tool",
+                        content=result,
+                        tool_call_id=tc["id"],
+                        name=tc["function"]["name"],
+                    )
                 )
 
         # Hit max iterations
         final = "Reached maximum iterations. Here's what I accomplished so far."
-        console.print(f"[red]{final}[/red]")
+        _plain(final, "red")
         return final
 
+    def _trim_history(self):
+        """Keep the system prompt plus at most about `max_history_messages` messages.
+
+        Once the limit is exceeded, history is cut back to about half of it, so
+        the client's cached formatting only has to be rebuilt every few turns
+        rather than on every turn. The window is widened rather than starting
+        on a tool result, so tool results always stay with the assistant
+        message that requested them. The latest user request is kept even if
+        it falls outside the window so the model doesn't lose track of the task.
+        """
+        limit = self.config.max_history_messages
+        if len(self.messages) - 1 <= limit:
+            return
+        start = len(self.messages) - max(1, limit // 2)
+        while start > 1 and self.messages[start].role == "tool":
+            start -= 1
+        kept = [self.messages[0]]
+        if self.messages[start].role != "user":
+            task = next((m for m in reversed(self.messages[1:start]) if m.role == "user"), None)
+            if task is not None:
+                kept.append(task)
+        trimmed = kept + self.messages[start:]
+        if len(trimmed) == len(self.messages):
+            return  # nothing would be dropped; keep the cached formatting
+        self.messages = trimmed
+        # The client's cached formatting no longer matches; resend the window
+        self._sent = 0
+        self.llm.reset_history()
+
+    def _submit(self, tc: dict, pending: list[Future[str]]) -> Future[str]:
+        """Start a tool call, printing what it is. Returns a future for its result.
+
+        Read-only tools run concurrently on the thread pool. Any other tool
+        first waits for every earlier call this turn and then runs inline, so
+        writes, edits and commands keep the order the model issued them in.
+        """
+        fn_name = tc["function"]["name"]
+        fn_args = parse_tool_arguments(tc)
+
+        # Show what's happening
+        args_summary = ", ".join(f"{k}={_shorten(v)}" for k, v in fn_args.items())
+        console.print(
+            Text.assemble((f"  ⚡ {fn_name}", "yellow"), f"({args_summary})"), highlight=False
+        )
+
+        if fn_name in _PARALLEL_SAFE_TOOLS:
+            return self._pool.submit(execute_tool, fn_name, fn_args, self._workspace_ctx)
+
+        wait(pending)
+        future: Future[str] = Future()
+        future.set_result(execute_tool(fn_name, fn_args, self._workspace_ctx))
+        return future
+
     def reset(self):
         """Clear conversation history."""
         self.messages = [Message(role="system", content=SYSTEM_PROMPT)]
+        self._sent = 0
+        self.llm.reset_history()
+
+    def close(self):
+        """Release the tool thread pool and the LLM client's network resources."""
+        self._pool.shutdown()
+        self.llm.close()
+
+    def __enter__(self) -> Agent:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
 
 def _shorten(value, max_len: int = 60) -> str:
-    """Shorten a value for display."""
-    s = str(value)
+    """Shorten a value for display, without stringifying large containers in full."""
+    if isinstance(value, str):
+        s = value
+    elif isinstance(value, (dict, list)):
+        s = f"<{type(value).__name__} of {len(value)}>"
+    else:
+        s = _short_repr.repr(value)
     if len(s) > max_len:
         return s[: max_len - 3] + "..."
     return s
+
+
+def _plain(text: str, style: str | None = None):
+    """Print text as-is: no markup parsing, highlighting or re-wrapping (no markup injection)."""
+    console.print(text, style=style, markup=False, highlight=False, soft_wrap=True)
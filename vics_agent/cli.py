@@ -6,14 +6,9 @@ import sys
 from pathlib import Path
 
 import click
-from rich.console import Console
-from rich.panel import Panel
 
 from vics_agent import __version__
-from vics_agent.agent import Agent
-from vics_agent.config import AgentConfig
-
-console = Console()
+from vics_agent._console import console
 
 BANNER = r"""
  ██╗   ██╗██╗ ██████╗███████╗     █████╗  ██████╗ ███████╗███╗   ██╗████████╗
@@ -43,6 +38,12 @@ def main(ctx, version):
 @click.option("--verbose", is_flag=True, help="Show debug info.")
 def chat(workspace, model, verbose):
     """Start an interactive chat session with Vics Agent."""
+    # Deferred so `vics --version` / `--help` don't pay for the agent stack
+    from rich.panel import Panel
+
+    from vics_agent.agent import Agent
+    from vics_agent.config import AgentConfig
+
     config = AgentConfig.from_env()
     config.workspace = Path(workspace)
     config.verbose = verbose
@@ -69,28 +70,27 @@ def chat(workspace, model, verbose):
     )
     console.print("[dim]Type your request. Use 'quit' to exit, 'reset' to clear history.[/dim]\n")
 
-    agent = Agent(config)
-
-    while True:
-        try:
-            user_input = console.input("[bold green]You>[/bold green] ").strip()
-        except (EOFError, KeyboardInterrupt):
-            console.print("\n[dim]Goodbye![/dim]")
-            break
-
-        if not user_input:
-            continue
-        if user_input.lower() in ("quit", "exit", "q"):
-            console.print("[dim]Goodbye![/dim]")
-            break
-        if user_input.lower() == "reset":
-            agent.reset()
-            console.print("[dim]Conversation reset.[/dim]\n")
-            continue
-
-        console.print()
-        agent.run(user_input)
-        console.print()
+    with Agent(config) as agent:
+        while True:
+            try:
+                user_input = console.input("[bold green]You>[/bold green] ").strip()
+            except (EOFError, KeyboardInterrupt):
+                console.print("\n[dim]Goodbye![/dim]")
+                break
+
+            if not user_input:
+                continue
+            if user_input.lower() in ("quit", "exit", "q"):
+                console.print("[dim]Goodbye![/dim]")
+                break
+            if user_input.lower() == "reset":
+                agent.reset()
+                console.print("[dim]Conversation reset.[/dim]\n")
+                continue
+
+            console.print()
+            agent.run(user_input)
+            console.print()
 
 
 @main.command()
@@ -99,6 +99,9 @@ def chat(workspace, model, verbose):
 @click.option("--model", "-m", type=str, default=None, help="Override LLM model name.")
 def ask(prompt, workspace, model):
     """Run a single prompt (non-interactive mode)."""
+    from vics_agent.agent import Agent
+    from vics_agent.config import AgentConfig
+
     config = AgentConfig.from_env()
     config.workspace = Path(workspace)
     if model:
@@ -108,8 +111,8 @@ def ask(prompt, workspace, model):
         console.print("[red]No API key found![/red] Set OPENAI_API_KEY or ANTHROPIC_API_KEY.")
         sys.exit(1)
 
-    agent = Agent(config)
-    agent.run(prompt)
+    with Agent(config) as agent:
+        agent.run(prompt)
 
 
 if __name__ == "__main__":
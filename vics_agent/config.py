@@ -3,35 +3,66 @@
 from __future__ import annotations
 
 import os
+import sys
+from dataclasses import dataclass, field
 from pathlib import Path
 
-from dotenv import load_dotenv
-from pydantic import BaseModel, Field
+_dotenv_loaded = False
 
-load_dotenv()
 
+def _load_dotenv_once():
+    """Read .env into the environment the first time configuration is built."""
+    global _dotenv_loaded
+    if not _dotenv_loaded:
+        from dotenv import load_dotenv
 
-class LLMConfig(BaseModel):
+        load_dotenv()
+        _dotenv_loaded = True
+
+
+@dataclass(slots=True)
+class LLMConfig:
     """LLM provider configuration."""
 
-    provider: str = Field(default="openai", description="LLM provider: 'openai' or 'anthropic'")
-    api_key: str = Field(default="", description="API key for the chosen provider")
-    model: str = Field(default="gpt-4o", description="Model name")
-    temperature: float = Field(default=0.1, ge=0.0, le=2.0)
-    max_tokens: int = Field(default=4096, gt=0)
+    provider: str = "openai"  # LLM provider: 'openai' or 'anthropic'
+    api_key: str = ""  # API key for the chosen provider
+    model: str = "gpt-4o"
+    temperature: float = 0.1
+    max_tokens: int = 4096
+
+    def __post_init__(self):
+        if not 0.0 <= self.temperature <= 2.0:
+            raise ValueError(f"temperature must be between 0.0 and 2.0, got {self.temperature}")
+        if self.max_tokens <= 0:
+            raise ValueError(f"max_tokens must be positive, got {self.max_tokens}")
 
 
-class AgentConfig(BaseModel):
+@dataclass(slots=True)
+class AgentConfig:
     """Top-level agent configuration."""
 
-    llm: LLMConfig = Field(default_factory=LLMConfig)
-    max_iterations: int = Field(default=25, gt=0, description="Max agent loop iterations")
-    workspace: Path = Field(default=Path("./workspace"), description="Working directory for file ops")
-    verbose: bool = Field(default=False)
+    llm: LLMConfig = field(default_factory=LLMConfig)
+    max_iterations: int = 25  # Max agent loop iterations
+    max_history_messages: int = 40  # Messages kept (besides the system prompt) per LLM call
+    workspace: Path = Path("./workspace")  # Working directory for file ops
+    verbose: bool = False
+    # Render the final response as Markdown (defaults to on for a TTY)
+    render_markdown: bool = field(default_factory=lambda: sys.stdout.isatty())
+
+    def __post_init__(self):
+        if self.max_iterations <= 0:
+            raise ValueError(f"max_iterations must be positive, got {self.max_iterations}")
+        if self.max_history_messages <= 0:
+            raise ValueError(
+                f"max_history_messages must be positive, got {self.max_history_messages}"
+            )
+        self.workspace = Path(self.workspace)
 
     @classmethod
     def from_env(cls) -> AgentConfig:
         """Build configuration from environment variables."""
+        _load_dotenv_once()
+
         # Determine provider
         anthropic_key = os.getenv("ANTHROPIC_API_KEY", "")
         openai_key = os.getenv("OPENAI_API_KEY", "")
@@ -50,5 +81,6 @@ class AgentConfig(BaseModel):
         return cls(
             llm=llm,
             max_iterations=int(os.getenv("VICS_MAX_ITERATIONS", "25")),
+            max_history_messages=int(os.getenv("VICS_MAX_HISTORY_MESSAGES", "40")),
             workspace=Path(os.getenv("VICS_WORKSPACE", "./workspace")),
         )
@@ -2,13 +2,15 @@
 
 from __future__ import annotations
 
-import json
+from collections.abc import Iterator, Sequence
 from dataclasses import dataclass, field
 
+import orjson
+
 from vics_agent.config import LLMConfig
 
 
-@dataclass
+@dataclass(slots=True)
 class Message:
     """A single message in the conversation."""
 
@@ -19,171 +21,323 @@ class Message:
     name: str | None = None
 
 
+@dataclass(slots=True)
+class ToolCallEvent:
+    """A tool call whose arguments have finished streaming."""
+
+    call: dict
+    text: str = ""  # assistant text streamed since the previous event
+
+
+@dataclass(slots=True)
+class TextEvent:
+    """Assistant text streamed after the last tool call of a reply."""
+
+    text: str
+
+
 class LLMClient:
     """Provider-agnostic LLM client with tool-calling support."""
 
-    def __init__(self, config: LLMConfig):
+    def __init__(self, config: LLMConfig, tools: Sequence[dict] | None = None):
         self.config = config
         self.provider = config.provider
+        # Default tool schemas (OpenAI format), frozen once for the whole session
+        self.tools: tuple[dict, ...] | None = tuple(tools) if tools else None
+
+        if self.provider not in ("openai", "anthropic"):
+            raise ValueError(f"Unsupported provider: {self.provider}")
+
+        import httpx
+
+        # One keep-alive HTTP/2 connection pool shared by every turn of the session
+        self._http = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=300.0),
+            timeout=60.0,
+        )
 
         if self.provider == "openai":
             from openai import OpenAI
 
-            self.client = OpenAI(api_key=config.api_key)
-        elif self.provider == "anthropic":
+            self.client = OpenAI(api_key=config.api_key, http_client=self._http)
+        else:
             import anthropic
 
-            self.client = anthropic.Anthropic(api_key=config.api_key)
-        else:
-            raise ValueError(f"Unsupported provider: {self.provider}")
+            self.client = anthropic.Anthropic(api_key=config.api_key, http_client=self._http)
+            # Converted tool schemas, keyed by id() of the OpenAI-format list. The
+            # source list is kept alongside so its id can't be reused while cached.
+            self._cached_anthropic_tools: dict[int, tuple[Sequence[dict], list[dict]]] = {}
+            if self.tools:
+                self._anthropic_tools_for(self.tools)
+
+        self.reset_history()
+
+    def close(self):
+        """Close the underlying HTTP connection pool."""
+        self._http.close()
+
+    def reset_history(self):
+        """Drop the cached provider-formatted conversation."""
+        self._openai_formatted: list[dict] = []
+        self._anthropic_formatted: list[dict] = []
+        self._anthropic_system = ""
 
     def chat(
         self,
         messages: list[Message],
-        tools: list[dict] | None = None,
+        tools: Sequence[dict] | None = None,
+    ) -> Message:
+        """Send the full conversation to the LLM and return the assistant response."""
+        self.reset_history()
+        return self.chat_incremental(messages, tools)
+
+    def chat_incremental(
+        self,
+        new_messages: list[Message],
+        tools: Sequence[dict] | None = None,
     ) -> Message:
-        """Send messages to the LLM and return the assistant response."""
+        """Like `stream_incremental`, but wait for and return only the final Message."""
+        for event in self.stream_incremental(new_messages, tools):
+            if isinstance(event, Message):
+                return event
+        raise RuntimeError("LLM stream ended without a response")
+
+    def stream_incremental(
+        self,
+        new_messages: list[Message],
+        tools: Sequence[dict] | None = None,
+    ) -> Iterator[ToolCallEvent | TextEvent | Message]:
+        """Send only the messages added since the previous call and stream the reply.
+
+        Each message is converted to the provider format once and appended to
+        the cached conversation, so a session costs O(turns) formatting work.
+        Yields a ToolCallEvent as soon as each tool call's arguments are
+        complete, a TextEvent if the reply made tool calls and then streamed
+        more text, and the full assistant Message last. `tools` defaults to
+        the schemas given at construction.
+        """
+        if tools is None:
+            tools = self.tools
         if self.provider == "openai":
-            return self._chat_openai(messages, tools)
-        else:
-            return self._chat_anthropic(messages, tools)
+            self._openai_formatted.extend(_msg_to_openai(m) for m in new_messages)
+            return self._stream_openai(self._openai_formatted, tools)
+        for m in new_messages:
+            if m.role == "system":
+                self._anthropic_system = m.content
+            else:
+                self._anthropic_formatted.append(_msg_to_anthropic(m))
+        return self._stream_anthropic(self._anthropic_formatted, tools)
 
     # ── OpenAI ───────────────────────────────────────────────────────────
 
-    def _chat_openai(self, messages: list[Message], tools: list[dict] | None) -> Message:
-        formatted = []
-        for m in messages:
-            entry: dict = {"role": m.role, "content": m.content}
-            if m.tool_calls:
-                entry["tool_calls"] = m.tool_calls
-            if m.tool_call_id:
-                entry["tool_call_id"] = m.tool_call_id
-            if m.name:
-                entry["name"] = m.name
-            formatted.append(entry)
-
+    def _stream_openai(
+        self, formatted: list[dict], tools: Sequence[dict] | None
+    ) -> Iterator[ToolCallEvent | TextEvent | Message]:
         kwargs: dict = {
             "model": self.config.model,
             "messages": formatted,
             "temperature": self.config.temperature,
             "max_tokens": self.config.max_tokens,
+            "stream": True,
         }
         if tools:
             kwargs["tools"] = tools
             kwargs["tool_choice"] = "auto"
 
-        response = self.client.chat.completions.create(**kwargs)
-        choice = response.choices[0]
-        msg = choice.message
-
-        tool_calls = []
-        if msg.tool_calls:
-            for tc in msg.tool_calls:
-                tool_calls.append(
-                    {
-                        "id": tc.id,
-                        "type": "function",
-                        "function": {
-                            "name": tc.function.name,
-                            "arguments": tc.function.arguments,
-                        },
-                    }
-                )
-
-        return Message(
+        text_parts: list[str] = []
+        flushed = 0  # text_parts already attached to an event
+        tool_calls: list[dict] = []
+        arg_parts: list[list[str]] = []
+        text_before: list[int] = []  # len(text_parts) when each call started
+
+        def finish(index: int) -> ToolCallEvent:
+            nonlocal flushed
+            call = tool_calls[index]
+            call["function"]["arguments"] = "".join(arg_parts[index])
+            parse_tool_arguments(call)
+            text = "".join(text_parts[flushed : text_before[index]])
+            flushed = text_before[index]
+            return ToolCallEvent(call=call, text=text)
+
+        for chunk in self.client.chat.completions.create(**kwargs):
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                text_parts.append(delta.content)
+            for tc in delta.tool_calls or ():
+                if tc.index >= len(tool_calls):
+                    # A new call has started, so the previous one is complete
+                    if tool_calls:
+                        yield finish(len(tool_calls) - 1)
+                    tool_calls.append(
+                        {"id": tc.id, "type": "function", "function": {"name": "", "arguments": ""}}
+                    )
+                    arg_parts.append([])
+                    text_before.append(len(text_parts))
+                if tc.function is not None:
+                    if tc.function.name:
+                        tool_calls[tc.index]["function"]["name"] += tc.function.name
+                    if tc.function.arguments:
+                        arg_parts[tc.index].append(tc.function.arguments)
+
+        if tool_calls:
+            yield finish(len(tool_calls) - 1)
+            if flushed < len(text_parts):
+                yield TextEvent("".join(text_parts[flushed:]))
+
+        yield Message(
             role="assistant",
-            content=msg.content or "",
+            content="".join(text_parts),
             tool_calls=tool_calls,
         )
 
     # ── Anthropic ────────────────────────────────────────────────────────
 
-    def _chat_anthropic(self, messages: list[Message], tools: list[dict] | None) -> Message:
-        # Extract system message
-        system_text = ""
-        api_messages = []
-        for m in messages:
-            if m.role == "system":
-                system_text = m.content
-                continue
-            if m.role == "tool":
-                api_messages.append(
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "tool_result",
-                                "tool_use_id": m.tool_call_id,
-                                "content": m.content,
-                            }
-                        ],
-                    }
-                )
-                continue
-            if m.tool_calls:
-                # Assistant message with tool use
-                content_blocks = []
-                if m.content:
-                    content_blocks.append({"type": "text", "text": m.content})
-                for tc in m.tool_calls:
-                    content_blocks.append(
-                        {
-                            "type": "tool_use",
-                            "id": tc["id"],
-                            "name": tc["function"]["name"],
-                            "input": json.loads(tc["function"]["arguments"]),
-                        }
-                    )
-                api_messages.append({"role": "assistant", "content": content_blocks})
-                continue
-            api_messages.append({"role": m.role, "content": m.content})
+    def _anthropic_tools_for(self, tools: Sequence[dict]) -> list[dict]:
+        """Convert tools from OpenAI format to Anthropic format, once per tools list."""
+        cached = self._cached_anthropic_tools.get(id(tools))
+        if cached is None:
+            cached = (tools, [_tool_to_anthropic(t) for t in tools])
+            self._cached_anthropic_tools[id(tools)] = cached
+        return cached[1]
 
-        # Convert tools from OpenAI format to Anthropic format
-        anthropic_tools = None
-        if tools:
-            anthropic_tools = []
-            for t in tools:
-                fn = t["function"]
-                anthropic_tools.append(
-                    {
-                        "name": fn["name"],
-                        "description": fn.get("description", ""),
-                        "input_schema": fn.get("parameters", {"type": "object", "properties": {}}),
-                    }
-                )
+    def _stream_anthropic(
+        self, api_messages: list[dict], tools: Sequence[dict] | None
+    ) -> Iterator[ToolCallEvent | TextEvent | Message]:
+        anthropic_tools = self._anthropic_tools_for(tools) if tools else None
 
         kwargs: dict = {
             "model": self.config.model,
             "max_tokens": self.config.max_tokens,
             "messages": api_messages,
         }
-        if system_text:
-            kwargs["system"] = system_text
+        if self._anthropic_system:
+            kwargs["system"] = self._anthropic_system
         if anthropic_tools:
             kwargs["tools"] = anthropic_tools
 
-        response = self.client.messages.create(**kwargs)
-
-        # Parse response
-        text_parts = []
-        tool_calls = []
-        for block in response.content:
-            if block.type == "text":
-                text_parts.append(block.text)
-            elif block.type == "tool_use":
-                tool_calls.append(
-                    {
-                        "id": block.id,
-                        "type": "function",
-                        "function": {
-                            "name": block.name,
-                            "arguments": json.dumps(block.input),
-                        },
-                    }
-                )
-
-        return Message(
+        text_blocks: list[str] = []
+        flushed = 0  # text_blocks already attached to an event
+        tool_calls: list[dict] = []
+        block_parts: list[str] = []  # deltas of the content block being streamed
+        current: dict | None = None  # tool call being streamed, if any
+
+        with self.client.messages.stream(**kwargs) as stream:
+            for event in stream:
+                if event.type == "content_block_start":
+                    block_parts = []
+                    block = event.content_block
+                    current = None
+                    if block.type == "tool_use":
+                        current = {
+                            "id": block.id,
+                            "type": "function",
+                            "function": {"name": block.name, "arguments": ""},
+                        }
+                elif event.type == "content_block_delta":
+                    if event.delta.type == "text_delta":
+                        block_parts.append(event.delta.text)
+                    elif event.delta.type == "input_json_delta":
+                        block_parts.append(event.delta.partial_json)
+                elif event.type == "content_block_stop":
+                    if current is None:
+                        text_blocks.append("".join(block_parts))
+                        continue
+                    current["function"]["arguments"] = "".join(block_parts) or "{}"
+                    parse_tool_arguments(current)
+                    tool_calls.append(current)
+                    text = "\n".join(text_blocks[flushed:])
+                    flushed = len(text_blocks)
+                    current = None
+                    yield ToolCallEvent(call=tool_calls[-1], text=text)
+
+        if tool_calls and flushed < len(text_blocks):
+            yield TextEvent("\n".join(text_blocks[flushed:]))
+
+        yield Message(
             role="assistant",
-            content="\n".join(text_parts),
+            content="\n".join(text_blocks),
             tool_calls=tool_calls,
         )
+
+
+# ── Message formatting ───────────────────────────────────────────────────
+
+
+def _msg_to_openai(m: Message) -> dict:
+    """Convert a Message to an OpenAI chat-completions message dict."""
+    entry: dict = {"role": m.role, "content": m.content}
+    if m.tool_calls:
+        # Strip the cached "_parsed" arguments; the API only accepts the string form
+        entry["tool_calls"] = [
+            {
+                "id": tc["id"],
+                "type": tc["type"],
+                "function": {
+                    "name": tc["function"]["name"],
+                    "arguments": tc["function"]["arguments"],
+                },
+            }
+            for tc in m.tool_calls
+        ]
+    if m.tool_call_id:
+        entry["tool_call_id"] = m.tool_call_id
+    if m.name:
+        entry["name"] = m.name
+    return entry
+
+
+def _msg_to_anthropic(m: Message) -> dict:
+    """Convert a non-system Message to an Anthropic messages-API dict."""
+    if m.role == "tool":
+        return {
+            "role": "user",
+            "content": [
+                {
+                    "type": "tool_result",
+                    "tool_use_id": m.tool_call_id,
+                    "content": m.content,
+                }
+            ],
+        }
+    if m.tool_calls:
+        # Assistant message with tool use
+        content_blocks = []
+        if m.content:
+            content_blocks.append({"type": "text", "text": m.content})
+        for tc in m.tool_calls:
+            content_blocks.append(
+                {
+                    "type": "tool_use",
+                    "id": tc["id"],
+                    "name": tc["function"]["name"],
+                    "input": parse_tool_arguments(tc),
+                }
+            )
+        return {"role": "assistant", "content": content_blocks}
+    return {"role": m.role, "content": m.content}
+
+
+def _tool_to_anthropic(t: dict) -> dict:
+    """Convert an OpenAI-format tool schema to Anthropic's format."""
+    fn = t["function"]
+    return {
+        "name": fn["name"],
+        "description": fn.get("description", ""),
+        "input_schema": fn.get("parameters", {"type": "object", "properties": {}}),
+    }
+
+
+def parse_tool_arguments(tc: dict) -> dict:
+    """Return a tool call's arguments as a dict, reusing the cached parse if present."""
+    fn = tc["function"]
+    parsed = fn.get("_parsed")
+    if parsed is None:
+        try:
+            parsed = orjson.loads(fn["arguments"])
+        except orjson.JSONDecodeError:
+            parsed = {}
+        fn["_parsed"] = parsed
+    return parsed
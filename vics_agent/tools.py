@@ -2,24 +2,84 @@
 
 from __future__ import annotations
 
-import json
+import errno
+import fnmatch
+import functools
+import itertools
+import mmap
 import os
+import re
+import signal
+import stat
 import subprocess
-from pathlib import Path
-from typing import Any, Callable
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path, PurePath
+from types import MappingProxyType
+from typing import Any, Callable, Iterator, Mapping, Sequence
+
+# ── Workspace ────────────────────────────────────────────────────────────
+
+
+@dataclass(frozen=True, slots=True)
+class WorkspaceCtx:
+    """A workspace root resolved once, so tools don't re-canonicalize it per call."""
+
+    path: Path  # resolved workspace root
+    resolved: str  # str(path), e.g. as a subprocess cwd
+
+    @classmethod
+    def from_path(cls, workspace: Path) -> WorkspaceCtx:
+        # Key the cache on the absolute path so a later os.chdir can't serve a stale root
+        return _resolve_workspace(workspace.absolute())
+
+
+@functools.lru_cache(maxsize=16)
+def _resolve_workspace(workspace: Path) -> WorkspaceCtx:
+    """Resolve an absolute workspace root once per distinct Path; later calls hit the cache."""
+    root = workspace.resolve()
+    return WorkspaceCtx(path=root, resolved=str(root))
+
+
+# ── Read cache ───────────────────────────────────────────────────────────
+
+# Decoded file contents keyed by resolved path, valid while (mtime_ns, size) match.
+# The agent re-reads the same handful of files across turns; hits skip disk and decode.
+_READ_CACHE: OrderedDict[Path, tuple[int, int, str]] = OrderedDict()
+_READ_CACHE_LOCK = threading.Lock()  # tools may run on the agent's thread pool
+_READ_CACHE_MAX_ENTRIES = 64
+_READ_CACHE_MAX_FILE_BYTES = 1024 * 1024
+
+# open(2) flags for direct file I/O: no fd leak into run_command children; binary on Windows
+_READ_FLAGS = os.O_RDONLY | getattr(os, "O_CLOEXEC", 0) | getattr(os, "O_BINARY", 0)
+_WRITE_FLAGS = (
+    os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_CLOEXEC", 0) | getattr(os, "O_BINARY", 0)
+)
+
 
 # ── Tool Registry ────────────────────────────────────────────────────────
 
-TOOL_REGISTRY: dict[str, Callable[..., str]] = {}
-TOOL_SCHEMAS: list[dict] = []
+# Filled in by @tool as the module loads, then published read-only at the bottom
+# of the module as TOOL_REGISTRY and TOOL_SCHEMAS
+_registry: dict[str, Callable[..., str]] = {}
+_schemas: list[dict] = []
+_frozen = False  # set once the registry is published; later @tool calls are refused
 
 
 def tool(name: str, description: str, parameters: dict):
     """Decorator to register a function as an agent tool."""
 
     def decorator(fn: Callable[..., str]) -> Callable[..., str]:
-        TOOL_REGISTRY[name] = fn
-        TOOL_SCHEMAS.append(
+        if _frozen:
+            raise RuntimeError(
+                f"Cannot register tool '{name}': the tool registry is frozen after import"
+            )
+        _registry[name] = fn
+        _schemas.append(
             {
                 "type": "function",
                 "function": {
@@ -34,10 +94,14 @@ def tool(name: str, description: str, parameters: dict):
     return decorator
 
 
-def execute_tool(name: str, arguments: dict[str, Any], workspace: Path) -> str:
+def execute_tool(name: str, arguments: dict[str, Any], workspace: Path | WorkspaceCtx) -> str:
     """Execute a registered tool by name with the given arguments."""
+    if name == "think":
+        return _THINK_REPLY  # nothing to do; skip the dispatch entirely
     if name not in TOOL_REGISTRY:
         return f"Error: Unknown tool '{name}'"
+    if not isinstance(workspace, WorkspaceCtx):
+        workspace = WorkspaceCtx.from_path(workspace)
     try:
         return TOOL_REGISTRY[name](workspace=workspace, **arguments)
     except Exception as e:
@@ -63,13 +127,58 @@ def execute_tool(name: str, arguments: dict[str, Any], workspace: Path) -> str:
         "required": ["path"],
     },
 )
-def read_file(workspace: Path, path: str) -> str:
-    target = (workspace / path).resolve()
-    if not str(target).startswith(str(workspace.resolve())):
+def read_file(workspace: WorkspaceCtx, path: str) -> str:
+    target = (workspace.path / path).resolve()
+    if not target.is_relative_to(workspace.path):
         return "Error: Access denied — path escapes workspace."
-    if not target.exists():
+    try:
+        fd = os.open(target, _READ_FLAGS)
+    except FileNotFoundError:
         return f"Error: File not found: {path}"
-    return target.read_text(encoding="utf-8", errors="replace")
+    try:
+        st = os.fstat(fd)
+        with _READ_CACHE_LOCK:
+            cached = _READ_CACHE.get(target)
+            if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+                _READ_CACHE.move_to_end(target)
+                return cached[2]
+        data = _read_exactly(fd, st.st_size)
+    finally:
+        os.close(fd)
+
+    text = data.decode("utf-8", errors="replace")
+    if "\r" in text:
+        # Universal newlines, as Path.read_text would have applied
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    if st.st_size <= _READ_CACHE_MAX_FILE_BYTES:
+        with _READ_CACHE_LOCK:
+            _READ_CACHE[target] = (st.st_mtime_ns, st.st_size, text)
+            _READ_CACHE.move_to_end(target)
+            if len(_READ_CACHE) > _READ_CACHE_MAX_ENTRIES:
+                _READ_CACHE.popitem(last=False)
+    return text
+
+
+def _read_exactly(fd: int, size: int) -> bytes:
+    """Read `size` bytes from fd (fewer at EOF), in one os.read call when possible."""
+    data = os.read(fd, size)
+    if len(data) == size or not data:
+        return data
+    parts = [data]
+    remaining = size - len(data)
+    while remaining:
+        chunk = os.read(fd, min(remaining, 1024 * 1024))
+        if not chunk:
+            break
+        parts.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(parts)
+
+
+def _forget_cached(target: Path):
+    """Drop a file from the read cache after the agent changes it."""
+    with _READ_CACHE_LOCK:
+        _READ_CACHE.pop(target, None)
 
 
 @tool(
@@ -90,12 +199,13 @@ def read_file(workspace: Path, path: str) -> str:
         "required": ["path", "content"],
     },
 )
-def write_file(workspace: Path, path: str, content: str) -> str:
-    target = (workspace / path).resolve()
-    if not str(target).startswith(str(workspace.resolve())):
+def write_file(workspace: WorkspaceCtx, path: str, content: str) -> str:
+    target = (workspace.path / path).resolve()
+    if not target.is_relative_to(workspace.path):
         return "Error: Access denied — path escapes workspace."
     target.parent.mkdir(parents=True, exist_ok=True)
-    target.write_text(content, encoding="utf-8")
+    _atomic_write(target, content)
+    _forget_cached(target)
     return f"Successfully wrote {len(content)} bytes to {path}"
 
 
@@ -121,23 +231,118 @@ def write_file(workspace: Path, path: str, content: str) -> str:
         "required": ["path", "old_string", "new_string"],
     },
 )
-def edit_file(workspace: Path, path: str, old_string: str, new_string: str) -> str:
-    target = (workspace / path).resolve()
-    if not str(target).startswith(str(workspace.resolve())):
+def edit_file(workspace: WorkspaceCtx, path: str, old_string: str, new_string: str) -> str:
+    target = (workspace.path / path).resolve()
+    if not target.is_relative_to(workspace.path):
         return "Error: Access denied — path escapes workspace."
     if not target.exists():
         return f"Error: File not found: {path}"
     content = target.read_text(encoding="utf-8")
-    count = content.count(old_string)
-    if count == 0:
-        return "Error: old_string not found in file."
-    if count > 1:
-        return f"Error: old_string found {count} times — must be unique. Add more context."
-    new_content = content.replace(old_string, new_string, 1)
-    target.write_text(new_content, encoding="utf-8")
+    content, error = _replace_unique(content, old_string, new_string)
+    if error:
+        return f"Error: {error}"
+    _atomic_write(target, content)
+    _forget_cached(target)
     return f"Successfully edited {path}"
 
 
+@tool(
+    name="edit_file_batch",
+    description=(
+        "Apply several exact-string replacements to one file in a single read/write. "
+        "Edits are applied in order; if any edit fails, the file is left unchanged."
+    ),
+    parameters={
+        "type": "object",
+        "properties": {
+            "path": {
+                "type": "string",
+                "description": "Relative path to the file within the workspace.",
+            },
+            "edits": {
+                "type": "array",
+                "description": (
+                    "Replacements to apply, in order. Each old_string must match "
+                    "exactly once at the time it is applied."
+                ),
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "old_string": {"type": "string"},
+                        "new_string": {"type": "string"},
+                    },
+                    "required": ["old_string", "new_string"],
+                },
+            },
+        },
+        "required": ["path", "edits"],
+    },
+)
+def edit_file_batch(workspace: WorkspaceCtx, path: str, edits: list[dict]) -> str:
+    target = (workspace.path / path).resolve()
+    if not target.is_relative_to(workspace.path):
+        return "Error: Access denied — path escapes workspace."
+    if not edits:
+        return "Error: edits must contain at least one edit."
+    if not target.exists():
+        return f"Error: File not found: {path}"
+    content = target.read_text(encoding="utf-8")
+    for n, edit in enumerate(edits, 1):
+        content, error = _replace_unique(content, edit["old_string"], edit["new_string"])
+        if error:
+            return f"Error: edit {n}: {error} No changes were written."
+    _atomic_write(target, content)
+    _forget_cached(target)
+    return f"Successfully applied {len(edits)} edits to {path}"
+
+
+def _replace_unique(content: str, old_string: str, new_string: str) -> tuple[str, str | None]:
+    """Replace the single occurrence of `old_string`. Returns (content, error message)."""
+    i = content.find(old_string)
+    if i < 0:
+        return content, "old_string not found in file."
+    end = i + len(old_string)
+    if content.find(old_string, end) >= 0:
+        count = content.count(old_string)
+        return content, f"old_string found {count} times — must be unique. Add more context."
+    return content[:i] + new_string + content[end:], None
+
+
+def _write_bytes(path: Path, data: bytes):
+    """Create or truncate `path` and write `data`, normally in a single write(2)."""
+    fd = os.open(path, _WRITE_FLAGS, 0o666)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view) :]
+    finally:
+        os.close(fd)
+
+
+def _atomic_write(target: Path, text: str):
+    """Write text to a sibling temp file, then rename it over `target`.
+
+    A crash mid-write leaves the original file intact instead of truncated.
+    An existing file's permission bits are preserved, and a read-only file is
+    refused with PermissionError just as a direct write would be.
+    """
+    # Renaming over a file only needs directory write access; don't let that
+    # bypass a read-only file, which a direct write would fail on
+    if not os.access(target, os.W_OK) and target.exists():
+        raise PermissionError(errno.EACCES, os.strerror(errno.EACCES), str(target))
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    try:
+        _write_bytes(tmp, text.encode("utf-8"))
+        try:
+            os.chmod(tmp, stat.S_IMODE(os.stat(target).st_mode))
+        except FileNotFoundError:
+            pass  # new file: keep the umask-derived default mode
+        os.replace(tmp, target)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
 @tool(
     name="list_directory",
     description="List files and directories in a given path. Returns names with '/' suffix for directories.",
@@ -152,20 +357,19 @@ def edit_file(workspace: Path, path: str, old_string: str, new_string: str) -> s
         "required": ["path"],
     },
 )
-def list_directory(workspace: Path, path: str) -> str:
-    target = (workspace / path).resolve()
-    if not str(target).startswith(str(workspace.resolve())):
+def list_directory(workspace: WorkspaceCtx, path: str) -> str:
+    target = (workspace.path / path).resolve()
+    if not target.is_relative_to(workspace.path):
         return "Error: Access denied — path escapes workspace."
     if not target.exists():
         return f"Error: Directory not found: {path}"
     if not target.is_dir():
         return f"Error: Not a directory: {path}"
-    entries = []
-    for item in sorted(target.iterdir()):
-        name = item.name
-        if item.is_dir():
-            name += "/"
-        entries.append(name)
+    # DirEntry.is_dir() uses the type from readdir; only symlinks need a stat
+    with os.scandir(target) as it:
+        entries = [(e.name, e.is_dir()) for e in it]
+    entries.sort()
+    entries = [name + "/" if is_dir else name for name, is_dir in entries]
     if not entries:
         return "(empty directory)"
     return "\n".join(entries)
@@ -189,37 +393,277 @@ def list_directory(workspace: Path, path: str) -> str:
         "required": ["pattern"],
     },
 )
-def search_files(workspace: Path, pattern: str, file_glob: str = "**/*") -> str:
-    import re
-
+def search_files(workspace: WorkspaceCtx, pattern: str, file_glob: str = "**/*") -> str:
     results = []
-    try:
-        regex = re.compile(pattern, re.IGNORECASE)
-    except re.error:
-        regex = re.compile(re.escape(pattern), re.IGNORECASE)
+    regex = _compile_search(pattern)
 
-    for file_path in workspace.resolve().rglob(file_glob):
-        if not file_path.is_file():
-            continue
-        # Skip binary files and hidden dirs
-        rel = file_path.relative_to(workspace.resolve())
-        if any(part.startswith(".") for part in rel.parts):
-            continue
-        try:
-            text = file_path.read_text(encoding="utf-8", errors="replace")
-        except Exception:
-            continue
-        for i, line in enumerate(text.splitlines(), 1):
-            if regex.search(line):
-                results.append(f"{rel}:{i}: {line.strip()}")
-                if len(results) >= 50:
-                    results.append("... (truncated at 50 matches)")
-                    return "\n".join(results)
+    for rel, matches in _scan_files(_walk(workspace.path, file_glob), regex, 50):
+        for i, line in matches[: 50 - len(results)]:
+            results.append(f"{rel}:{i}: {line.strip()}")
+        if len(results) >= 50:
+            results.append("... (truncated at 50 matches)")
+            return "\n".join(results)
     if not results:
         return "No matches found."
     return "\n".join(results)
 
 
+_SEARCH_WORKERS = min(8, os.cpu_count() or 4)
+
+
+def _scan_files(
+    files: Iterator[tuple[str, str]],
+    regex: re.Pattern[bytes] | re.Pattern[str] | bytes,
+    limit: int,
+) -> Iterator[tuple[str, list[tuple[int, str]]]]:
+    """Yield (relative path, matches) for each file, in walk order.
+
+    Files are scanned concurrently on a small thread pool (mmap reads and
+    bytes regex matching release the GIL), keeping a bounded window of scans
+    in flight ahead of the consumer. When the caller stops early, queued
+    scans are cancelled. Small result sets are scanned inline.
+    """
+
+    def scan(file_path: str) -> list[tuple[int, str]]:
+        try:
+            return _scan_file(file_path, regex, limit)
+        except (OSError, ValueError):
+            return []
+
+    first = list(itertools.islice(files, _SEARCH_WORKERS * 4))
+    if len(first) < _SEARCH_WORKERS:
+        for rel, file_path in first:
+            yield rel, scan(file_path)
+        return
+
+    pool = ThreadPoolExecutor(max_workers=_SEARCH_WORKERS, thread_name_prefix="vics-search")
+    try:
+        window = deque((rel, pool.submit(scan, file_path)) for rel, file_path in first)
+        while window:
+            rel, future = window.popleft()
+            nxt = next(files, None)
+            if nxt is not None:
+                window.append((nxt[0], pool.submit(scan, nxt[1])))
+            yield rel, future.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Vendored dependencies, caches and build output: large, and never what a search is after
+_PRUNED_DIRS = frozenset({"node_modules", "__pycache__", "target", "dist", "build"})
+
+
+def _walk(root: Path, file_glob: str) -> Iterator[tuple[str, str]]:
+    """Yield (relative path, full path) for each file under `root` matching `file_glob`.
+
+    Matches like `Path.rglob`, but walks with os.scandir so entry types come
+    from the directory listing instead of a stat per entry. Hidden entries are
+    skipped, and neither hidden directories nor dependency/build output
+    directories (`_PRUNED_DIRS`) are descended into, unless a directory part of
+    `file_glob` could name them (e.g. "build/*.py"). Symlinks are not followed.
+    """
+    pattern = file_glob
+    while pattern.startswith("**/"):
+        pattern = pattern[3:]
+    dir_parts = pattern.split("/")[:-1]
+    pruned = {
+        d for d in _PRUNED_DIRS if not any(fnmatch.fnmatchcase(d, part) for part in dir_parts)
+    }
+    if pattern in ("*", "**", ""):
+        match = None  # the default "**/*": no per-entry pattern matching at all
+    elif "**" in pattern:
+        # Rare: recursive wildcard mid-pattern. Let rglob decide, then walk as usual.
+        allowed = {str(p.relative_to(root)) for p in root.rglob(file_glob)}
+
+        def match(rel: str, name: str) -> bool:
+            return rel in allowed
+
+    elif "/" in pattern:
+
+        def match(rel: str, name: str) -> bool:
+            return PurePath(rel).match(pattern)
+
+    else:
+        # Translated once, instead of fnmatch's normcase + cache lookup per entry
+        name_match = re.compile(
+            fnmatch.translate(pattern), re.IGNORECASE if os.name == "nt" else 0
+        ).match
+
+        def match(rel: str, name: str) -> bool:
+            return name_match(name) is not None
+
+    stack = [("", str(root))]
+    while stack:
+        prefix, dir_path = stack.pop()
+        try:
+            with os.scandir(dir_path) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            rel = prefix + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in pruned:
+                    subdirs.append((rel + os.sep, entry.path))
+            elif entry.is_file(follow_symlinks=False) and (match is None or match(rel, entry.name)):
+                yield rel, entry.path
+        stack.extend(reversed(subdirs))
+
+
+# Characters with special meaning in a regex; a pattern without any is a plain literal
+_REGEX_META = frozenset(".^$*+?()[]{}|\\")
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_search(pattern: str) -> re.Pattern[bytes] | re.Pattern[str] | bytes:
+    """Compile a search pattern, falling back to a literal match if it isn't a valid regex.
+
+    ASCII patterns compile to a bytes regex that runs over the raw file. Literal
+    ASCII patterns with no letters (so case-insensitivity is moot) and no line
+    breaks are returned as a bytes needle for a plain `find` instead. Patterns
+    with non-ASCII characters compile to a str regex, since only that folds the
+    case of non-ASCII letters; those files are searched as decoded text.
+    """
+    if not pattern.isascii():
+        try:
+            return re.compile(pattern, re.IGNORECASE)
+        except re.error:
+            return re.compile(re.escape(pattern), re.IGNORECASE)
+    needle = pattern.encode()
+    if (
+        not _REGEX_META.intersection(pattern)
+        and needle.lower() == needle.upper()
+        and b"\n" not in needle
+        and b"\r" not in needle
+    ):
+        return needle
+    try:
+        return re.compile(needle, re.IGNORECASE | re.MULTILINE)
+    except re.error:
+        return re.compile(re.escape(needle), re.IGNORECASE | re.MULTILINE)
+
+
+_BINARY_SNIFF_BYTES = 8192
+_NEWLINE_COUNT_CHUNK = 1024 * 1024
+_SEARCH_MAX_FILE_BYTES = 50 * 1024 * 1024  # larger files are skipped outright
+
+
+def _scan_file(
+    file_path: str, regex: re.Pattern[bytes] | re.Pattern[str] | bytes, limit: int
+) -> list[tuple[int, str]]:
+    """Return up to `limit` (line number, line) pairs of lines in the file matching `regex`.
+
+    `regex` may also be a literal bytes needle, which is located with `find`.
+
+    The file is memory-mapped and searched in place, so only matching lines are
+    decoded. The whole buffer is scanned in one forward pass: there is no
+    per-line split, and line numbers come from counting newlines between
+    successive matches, a bounded chunk at a time. A match only counts if it
+    fits within a single line (excluding the line terminator), mirroring a
+    line-by-line search. CRLF files searched with a `$` pattern are checked
+    line by line instead, so `$` can match before the carriage return, and str
+    patterns run over the decoded text. Binary files (a NUL in the first 8 KiB)
+    and files over 50 MiB are skipped.
+    """
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        if size == 0 or size > _SEARCH_MAX_FILE_BYTES:
+            return []
+        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+            # Like grep/ripgrep, treat a NUL byte near the start as a binary file
+            if mm.find(b"\0", 0, _BINARY_SNIFF_BYTES) != -1:
+                return []
+            if isinstance(regex, re.Pattern) and isinstance(regex.pattern, str):
+                return _scan_text(mm[:].decode("utf-8", errors="replace"), regex, limit)
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            # A trailing newline terminates the last line; it doesn't start a new one
+            stop = size - 1 if mm[-1] == 0x0A else size
+            literal = isinstance(regex, bytes)
+            if not literal and b"$" in regex.pattern and mm.find(b"\r") != -1:
+                return _scan_lines(mm, regex, stop, limit)
+            found = []
+            lineno, counted = 1, 0  # line number at byte offset `counted`
+            pos = 0
+            while pos <= stop and len(found) < limit:
+                if literal:
+                    m_start = mm.find(regex, pos, stop)
+                    if m_start < 0:
+                        break
+                    m_end = m_start + len(regex)
+                else:
+                    m = regex.search(mm, pos, stop)
+                    if m is None:
+                        break
+                    m_start, m_end = m.span()
+                start = mm.rfind(b"\n", 0, m_start) + 1
+                end = mm.find(b"\n", m_start, stop)
+                if end < 0:
+                    end = stop
+                line_end = end - 1 if end > start and mm[end - 1] == 0x0D else end
+                if m_end > line_end and regex.search(mm, start, line_end) is None:
+                    pos = end + 1  # match spilled past this line; no match within it
+                    continue
+                lineno += _count_newlines(mm, counted, start)
+                counted = start
+                found.append((lineno, mm[start:line_end].decode("utf-8", errors="replace")))
+                pos = end + 1  # one result per line
+            return found
+    finally:
+        os.close(fd)
+
+
+def _scan_lines(
+    mm: mmap.mmap, regex: re.Pattern[bytes], stop: int, limit: int
+) -> list[tuple[int, str]]:
+    """Search each line of `mm[:stop]` separately, stopping before any CRLF carriage return."""
+    found = []
+    lineno, start = 1, 0
+    while start <= stop and len(found) < limit:
+        end = mm.find(b"\n", start, stop)
+        if end < 0:
+            end = stop
+        line_end = end - 1 if end > start and mm[end - 1] == 0x0D else end
+        if regex.search(mm, start, line_end) is not None:
+            found.append((lineno, mm[start:line_end].decode("utf-8", errors="replace")))
+        lineno += 1
+        start = end + 1
+    return found
+
+
+def _scan_text(text: str, regex: re.Pattern[str], limit: int) -> list[tuple[int, str]]:
+    """Search decoded text line by line, for patterns that need Unicode case folding."""
+    found = []
+    for i, line in enumerate(text.splitlines(), 1):
+        if regex.search(line):
+            found.append((i, line))
+            if len(found) >= limit:
+                break
+    return found
+
+
+def _count_newlines(mm: mmap.mmap, start: int, end: int) -> int:
+    """Count newlines in mm[start:end], copying at most `_NEWLINE_COUNT_CHUNK` bytes at once."""
+    count = 0
+    for pos in range(start, end, _NEWLINE_COUNT_CHUNK):
+        count += mm[pos : min(pos + _NEWLINE_COUNT_CHUNK, end)].count(b"\n")
+    return count
+
+
+# Keep commands from littering the workspace with __pycache__ directories. Set
+# once in our own environment so each run_command inherits it without a copy.
+os.environ.setdefault("PYTHONDONTWRITEBYTECODE", "1")
+
+_BLOCKED_COMMANDS = re.compile(
+    "|".join(re.escape(b) for b in ["rm -rf /", "format c:", "del /f /s /q c:", ":(){:|:&};:"]),
+    re.IGNORECASE,
+)
+
+
 @tool(
     name="run_command",
     description="Execute a shell command in the workspace directory. Returns stdout and stderr. Use for running tests, installing packages, building projects, etc.",
@@ -238,32 +682,107 @@ def search_files(workspace: Path, pattern: str, file_glob: str = "**/*") -> str:
         "required": ["command"],
     },
 )
-def run_command(workspace: Path, command: str, timeout: int = 60) -> str:
+def run_command(workspace: WorkspaceCtx, command: str, timeout: int = 60) -> str:
     # Safety: block destructive system commands
-    blocked = ["rm -rf /", "format c:", "del /f /s /q c:", ":(){:|:&};:"]
-    if any(b in command.lower() for b in blocked):
+    if _BLOCKED_COMMANDS.search(command):
         return "Error: This command is blocked for safety."
 
+    proc = subprocess.Popen(
+        command,
+        shell=True,
+        cwd=workspace.resolved,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        start_new_session=os.name == "posix",  # so a timeout can kill the whole group
+    )
+    stdout, stderr = _OutputTail(), _OutputTail()
+    readers = [
+        threading.Thread(target=tail.drain, args=(pipe,), daemon=True)
+        for tail, pipe in ((stdout, proc.stdout), (stderr, proc.stderr))
+    ]
+    for reader in readers:
+        reader.start()
+    deadline = time.monotonic() + timeout
     try:
-        result = subprocess.run(
-            command,
-            shell=True,
-            cwd=str(workspace.resolve()),
-            capture_output=True,
-            text=True,
-            timeout=timeout,
-            env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        try:
+            returncode = proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            _kill_process_tree(proc)
+            return f"Error: Command timed out after {timeout}s."
+        # A background child can keep the pipes open after the shell exits
+        for reader in readers:
+            reader.join(max(0.0, deadline - time.monotonic()))
+        lingering = any(reader.is_alive() for reader in readers)
+        if lingering:
+            _kill_process_tree(proc)
+            for reader in readers:
+                reader.join(1.0)
+    except BaseException:
+        # Ctrl-C never reaches the command's own session; don't leave it running
+        _kill_process_tree(proc)
+        raise
+
+    output = stdout.text()
+    err = stderr.text()
+    if err:
+        output += ("\n--- stderr ---\n" + err) if output else err
+    if returncode != 0:
+        output += f"\n(exit code: {returncode})"
+    if lingering:
+        output += (
+            f"\n(output cut off after {timeout}s: background processes still held it open"
+            " and were killed)"
         )
-        output = ""
-        if result.stdout:
-            output += result.stdout
-        if result.stderr:
-            output += ("\n--- stderr ---\n" + result.stderr) if output else result.stderr
-        if result.returncode != 0:
-            output += f"\n(exit code: {result.returncode})"
-        return output.strip() or "(no output)"
-    except subprocess.TimeoutExpired:
-        return f"Error: Command timed out after {timeout}s."
+    return output.strip() or "(no output)"
+
+
+_OUTPUT_TAIL_BYTES = 64 * 1024  # per stream; older output is dropped
+
+
+class _OutputTail:
+    """Keeps the last `_OUTPUT_TAIL_BYTES` of a stream, so chatty commands use bounded memory."""
+
+    def __init__(self):
+        self._chunks: deque[bytes] = deque()
+        self._size = 0
+        self._dropped = False
+        self._lock = threading.Lock()  # text() may run while a reader is still draining
+
+    def drain(self, pipe):
+        """Read `pipe` to EOF, keeping only the tail. Runs on a reader thread."""
+        with pipe:
+            while chunk := pipe.read1(65536):
+                with self._lock:
+                    self._chunks.append(chunk)
+                    self._size += len(chunk)
+                    while self._size - len(self._chunks[0]) >= _OUTPUT_TAIL_BYTES:
+                        self._size -= len(self._chunks.popleft())
+                        self._dropped = True
+
+    def text(self) -> str:
+        with self._lock:
+            data = b"".join(self._chunks)
+        if len(data) > _OUTPUT_TAIL_BYTES:
+            data = data[-_OUTPUT_TAIL_BYTES:]
+            self._dropped = True
+        # Universal newlines, as with subprocess text mode
+        text = data.decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+        if self._dropped:
+            text = f"... (output truncated to the last {_OUTPUT_TAIL_BYTES // 1024} KiB)\n" + text
+        return text
+
+
+def _kill_process_tree(proc: subprocess.Popen):
+    """Kill a command, including anything its shell started."""
+    try:
+        if os.name == "posix":
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except OSError:
+        pass  # already gone
+    proc.wait()
 
 
 @tool(
@@ -280,15 +799,16 @@ def run_command(workspace: Path, command: str, timeout: int = 60) -> str:
         "required": ["path"],
     },
 )
-def delete_file(workspace: Path, path: str) -> str:
-    target = (workspace / path).resolve()
-    if not str(target).startswith(str(workspace.resolve())):
+def delete_file(workspace: WorkspaceCtx, path: str) -> str:
+    target = (workspace.path / path).resolve()
+    if not target.is_relative_to(workspace.path):
         return "Error: Access denied — path escapes workspace."
     if not target.exists():
         return f"Error: File not found: {path}"
     if target.is_dir():
         return "Error: Use run_command to remove directories."
     target.unlink()
+    _forget_cached(target)
     return f"Deleted {path}"
 
 
@@ -306,5 +826,18 @@ def delete_file(workspace: Path, path: str) -> str:
         "required": ["thought"],
     },
 )
-def think(workspace: Path, thought: str) -> str:
-    return "Thought recorded. Continue with your plan."
+def think(workspace: WorkspaceCtx, thought: str) -> str:
+    return _THINK_REPLY
+
+
+_THINK_REPLY = sys.intern("Thought recorded. Continue with your plan.")
+
+
+# ── Freeze the registry ──────────────────────────────────────────────────
+
+# Every tool is registered by now. The schemas are sent to the model on every
+# turn and never change, so both are published in read-only form and @tool
+# refuses any later registration that would leave them out of sync.
+TOOL_REGISTRY: Mapping[str, Callable[..., str]] = MappingProxyType(dict(_registry))
+TOOL_SCHEMAS: Sequence[dict] = tuple(_schemas)
+_frozen = True